@@ -14,8 +14,8 @@ Models supported:
 
 import asyncio
 import uvicorn
-from fastapi import FastAPI, HTTPException, File, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request, Query
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import torch
 import numpy as np
@@ -24,6 +24,14 @@ import os
 import subprocess
 import json
 import io
+import base64
+import time
+import uuid
+import hmac
+import cProfile
+import pstats
+import contextlib
+import contextvars
 from typing import Optional, Dict, Any
 import logging
 
@@ -31,6 +39,130 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Project007")
 
+# Profiling configuration (profiling is disabled unless an admin token is set)
+ADMIN_TOKEN = os.environ.get("PROJECT007_ADMIN_TOKEN", "")
+PROFILE_DIR = os.environ.get(
+    "PROJECT007_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "project007_profiles")
+)
+PROFILE_MAX_TRACES = max(int(os.environ.get("PROJECT007_PROFILE_MAX_TRACES", "20")), 1)
+
+# Scene composition limits
+SCENE_MAX_OBJECTS = 64
+SCENE_MAX_MESHES = 128
+SCENE_MAX_INSTANCES = 10000
+SCENE_MAX_VARIANTS = 16
+
+# Procedural mesh kinds by prompt keyword, checked in order
+MESH_KEYWORDS = [
+    ("sphere", ["sphere"]),
+    ("cube", ["cube"]),
+    ("cylinder", ["cylinder"]),
+    ("building", ["building", "house", "tower"]),
+    ("organic", ["tree", "plant", "organic"]),
+]
+VARIED_MESH_KINDS = {"building", "organic"}
+
+# Adaptive quality configuration
+LATENCY_SLO_MS = {
+    "stable_diffusion": float(os.environ.get("PROJECT007_SD_SLO_MS", "10000")),
+    "whisper": float(os.environ.get("PROJECT007_WHISPER_SLO_MS", "5000")),
+}
+QUEUE_LIMIT = max(int(os.environ.get("PROJECT007_QUEUE_LIMIT", "4")), 1)
+
+QUALITY_TIERS = ["full", "reduced", "minimal"]
+SD_TIER_SETTINGS = {
+    "full": {"max_steps": None, "resolution": 512},
+    "reduced": {"max_steps": 12, "resolution": 512},
+    "minimal": {"max_steps": 8, "resolution": 384},
+}
+WHISPER_TIER_MODELS = {"full": "base", "reduced": "tiny", "minimal": "tiny"}
+
+# Set while a request runs under run_profiled: the event-loop profiler plus
+# the per-thread profilers started for its model work
+profile_session = contextvars.ContextVar("profile_session", default=None)
+
+
+class QualityController:
+    """
+    Picks a quality tier per service from observed latency and queue depth.
+    
+    Pressure is the worse of smoothed latency vs. the SLO and requests
+    already in flight (the queue ahead of a new one) vs. the queue limit. Tiers drop as soon as pressure crosses a
+    threshold but only recover one step at a time once pressure is well
+    below it, so quality doesn't flap at the boundary.
+    """
+    
+    DEGRADE_THRESHOLDS = [1.0, 1.5]  # pressure for "reduced", "minimal"
+    RESTORE_PRESSURE = 0.7
+    SMOOTHING = 0.3
+    IDLE_RESET_S = 30.0
+    
+    def __init__(self, slo_ms: Dict[str, float], queue_limit: int):
+        self.slo_ms = slo_ms
+        self.queue_limit = max(queue_limit, 1)
+        self.in_flight = {service: 0 for service in slo_ms}
+        self.latency_ms = {service: 0.0 for service in slo_ms}
+        self.last_seen = {service: 0.0 for service in slo_ms}
+        self.tier = {service: 0 for service in slo_ms}
+    
+    def pressure(self, service: str) -> float:
+        """Current load relative to the SLO and queue limit"""
+        latency_ms = self.latency_ms[service]
+        if time.time() - self.last_seen[service] > self.IDLE_RESET_S:
+            latency_ms = 0.0  # Stale observations don't reflect current load
+        
+        return max(
+            latency_ms / self.slo_ms[service],
+            self.in_flight[service] / self.queue_limit
+        )
+    
+    def select(self, service: str) -> str:
+        """Update and return the tier for the next request"""
+        pressure = self.pressure(service)
+        target = sum(pressure >= threshold for threshold in self.DEGRADE_THRESHOLDS)
+        current = self.tier[service]
+        
+        if target > current:
+            current = target
+        elif pressure < self.RESTORE_PRESSURE and current > 0:
+            current -= 1
+        
+        if current != self.tier[service]:
+            logger.info(f"🎚️ {service} quality: {QUALITY_TIERS[self.tier[service]]} → "
+                        f"{QUALITY_TIERS[current]} (pressure {pressure:.2f})")
+            self.tier[service] = current
+        
+        return QUALITY_TIERS[current]
+    
+    @contextlib.contextmanager
+    def track(self, service: str, record: bool = True):
+        """Count a request as in flight, yield its tier and record its latency"""
+        # Select first so queue depth counts only the requests ahead of this one
+        tier = self.select(service)
+        self.in_flight[service] += 1
+        started = time.time()
+        try:
+            yield tier
+        finally:
+            self.in_flight[service] -= 1
+            if record:
+                elapsed_ms = (time.time() - started) * 1000
+                self.latency_ms[service] += self.SMOOTHING * (elapsed_ms - self.latency_ms[service])
+                self.last_seen[service] = time.time()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Report controller state per service"""
+        return {
+            service: {
+                "tier": QUALITY_TIERS[self.tier[service]],
+                "in_flight": self.in_flight[service],
+                "latency_ms": round(self.latency_ms[service], 1),
+                "slo_ms": self.slo_ms[service]
+            }
+            for service in self.slo_ms
+        }
+
+
 class Project007LocalAI:
     """
     🕶️ PROJECT 007: AUTONOMOUS AI INTELLIGENCE SUITE
@@ -46,6 +178,13 @@ class Project007LocalAI:
         self.models = {}
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
+        # Only one request can own the interpreter-wide profiler at a time
+        self.profile_lock = asyncio.Lock()
+        
+        # Adaptive quality under load; one model call per service at a time
+        self.quality = QualityController(LATENCY_SLO_MS, QUEUE_LIMIT)
+        self.inference_locks = {service: asyncio.Lock() for service in LATENCY_SLO_MS}
+        
         logger.info("🕶️ PROJECT 007: AGENT BOND AI SUITE INITIALIZING...")
         logger.info(f"🎯 Device: {self.device}")
     
@@ -57,6 +196,7 @@ class Project007LocalAI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Quality-Tier", "X-Quality-Steps", "X-Quality-Resolution", "X-Profile-Id"],
         )
     
     def setup_routes(self):
@@ -73,7 +213,11 @@ class Project007LocalAI:
         
         @self.app.get("/health")
         async def health_check():
-            return {"status": "healthy", "models_loaded": len(self.models)}
+            return {
+                "status": "healthy",
+                "models_loaded": len(self.models),
+                "quality": self.quality.snapshot()
+            }
         
         # ============================================================
         # LLM ENDPOINTS
@@ -134,7 +278,8 @@ class Project007LocalAI:
                 raise HTTPException(status_code=500, detail=str(e))
         
         @self.app.post("/shap-e/generate")
-        async def generate_3d_shape(data: dict):
+        async def generate_3d_shape(data: dict, request: Request):
+            profile = self.profiling_requested(request)
             try:
                 prompt = data.get("prompt", "")
                 guidance_scale = data.get("guidance_scale", 15.0)
@@ -146,20 +291,71 @@ class Project007LocalAI:
                 if 'shap_e' not in self.models:
                     await self.load_shap_e()
                 
-                # Generate 3D shape
-                mesh_data = await self.generate_with_shap_e(prompt, guidance_scale)
+                async def run():
+                    # Generate 3D shape
+                    mesh_data = await self.generate_with_shap_e(prompt, guidance_scale)
+                    
+                    return JSONResponse({
+                        "status": "success",
+                        "prompt": prompt,
+                        "mesh_data": mesh_data,
+                        "guidance_scale": guidance_scale
+                    })
                 
-                return {
-                    "status": "success",
-                    "prompt": prompt,
-                    "mesh_data": mesh_data,
-                    "guidance_scale": guidance_scale
-                }
+                if profile:
+                    return await self.run_profiled("shap-e/generate", run)
+                return await run()
                 
             except Exception as e:
                 logger.error(f"Shap-E generation failed: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
+        @self.app.post("/scene/generate")
+        async def generate_scene(data: dict, request: Request):
+            profile = self.profiling_requested(request)
+            try:
+                objects = data.get("objects", [])
+                transform_format = data.get("transform_format", "matrix")
+                try:
+                    seed = int(data.get("seed", 0))
+                    area = float(data.get("area", 100.0))
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="seed and area must be numbers")
+                
+                if not objects or not isinstance(objects, list):
+                    raise HTTPException(status_code=400, detail="Objects required")
+                if len(objects) > SCENE_MAX_OBJECTS:
+                    raise HTTPException(status_code=400, detail=f"Scene is limited to {SCENE_MAX_OBJECTS} objects")
+                if seed < 0:
+                    raise HTTPException(status_code=400, detail="seed must not be negative")
+                if not np.isfinite(area) or area <= 0:
+                    raise HTTPException(status_code=400, detail="area must be a finite positive number")
+                if transform_format not in ("matrix", "trs"):
+                    raise HTTPException(status_code=400, detail="transform_format must be 'matrix' or 'trs'")
+                
+                async def run():
+                    # Compose instanced scene
+                    scene = await self.generate_instanced_scene(objects, seed, area, transform_format)
+                    
+                    return JSONResponse({
+                        "status": "success",
+                        "seed": seed,
+                        "transform_format": transform_format,
+                        **scene
+                    })
+                
+                if profile:
+                    return await self.run_profiled("scene/generate", run)
+                return await run()
+                
+            except HTTPException:
+                raise
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                logger.error(f"Scene generation failed: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+        
         # ============================================================
         # VOICE PROCESSING ENDPOINTS
         # ============================================================
@@ -167,18 +363,22 @@ class Project007LocalAI:
         @self.app.post("/whisper/transcribe")
         async def transcribe_audio(audio: UploadFile = File(...)):
             try:
-                # Load Whisper if not already loaded
-                if 'whisper' not in self.models:
-                    await self.load_whisper()
-                
                 # Save uploaded audio to temp file
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
                     content = await audio.read()
                     tmp.write(content)
                     tmp_path = tmp.name
                 
-                # Transcribe with Whisper
-                transcript = await self.transcribe_with_whisper(tmp_path)
+                # Load every tier's Whisper model up front, so degrading
+                # under load never has to load one
+                await self.load_whisper_tiers()
+                
+                with self.quality.track("whisper") as tier:
+                    model_size = WHISPER_TIER_MODELS[tier]
+                    
+                    # Transcribe with Whisper
+                    async with self.inference_locks["whisper"]:
+                        transcript = await self.transcribe_with_whisper(tmp_path, model_size)
                 
                 # Clean up
                 os.unlink(tmp_path)
@@ -186,7 +386,9 @@ class Project007LocalAI:
                 return {
                     "transcript": transcript,
                     "confidence": 0.95,  # Whisper doesn't provide confidence scores
-                    "language": "en"
+                    "language": "en",
+                    "model": model_size,
+                    "quality_tier": tier
                 }
                 
             except Exception as e:
@@ -223,7 +425,8 @@ class Project007LocalAI:
         # ============================================================
         
         @self.app.post("/stable-diffusion/generate")
-        async def generate_image(data: dict):
+        async def generate_image(data: dict, request: Request):
+            profile = self.profiling_requested(request)
             try:
                 prompt = data.get("prompt", "")
                 negative_prompt = data.get("negative_prompt", "")
@@ -237,19 +440,192 @@ class Project007LocalAI:
                 if 'stable_diffusion' not in self.models:
                     await self.load_stable_diffusion()
                 
-                # Generate image
-                image_data = await self.generate_with_stable_diffusion(
-                    prompt, negative_prompt, steps, guidance_scale
-                )
+                async def run():
+                    # Profiled runs are inflated by the profiler; keep them out of the latency SLO
+                    with self.quality.track("stable_diffusion", record=profile_session.get() is None) as tier:
+                        settings = SD_TIER_SETTINGS[tier]
+                        tier_steps = int(steps)
+                        if settings["max_steps"] is not None:
+                            tier_steps = min(tier_steps, settings["max_steps"])
+                        resolution = settings["resolution"]
+                        
+                        # Generate image
+                        async with self.inference_slot("stable_diffusion"):
+                            image_data = await self.generate_with_stable_diffusion(
+                                prompt, negative_prompt, tier_steps, guidance_scale, resolution
+                            )
+                    
+                    return StreamingResponse(
+                        io.BytesIO(image_data),
+                        media_type="image/png",
+                        headers={
+                            "X-Quality-Tier": tier,
+                            "X-Quality-Steps": str(tier_steps),
+                            "X-Quality-Resolution": str(resolution)
+                        }
+                    )
                 
-                return StreamingResponse(
-                    io.BytesIO(image_data),
-                    media_type="image/png"
-                )
+                if profile:
+                    return await self.run_profiled("stable-diffusion/generate", run, service="stable_diffusion")
+                return await run()
                 
             except Exception as e:
                 logger.error(f"Stable Diffusion generation failed: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
+        
+        # ============================================================
+        # ADMIN PROFILING ENDPOINTS
+        # ============================================================
+        
+        @self.app.get("/admin/profiles")
+        async def list_profiles(request: Request):
+            self.require_admin(request)
+            return {"traces": self.list_profile_traces()}
+        
+        @self.app.get("/admin/profiles/{trace_id}")
+        async def download_profile(trace_id: str, request: Request,
+                                   fmt: str = Query("pstats", alias="format")):
+            self.require_admin(request)
+            
+            if fmt not in ("pstats", "chrome"):
+                raise HTTPException(status_code=400, detail="Format must be 'pstats' or 'chrome'")
+            
+            path = self.profile_trace_path(trace_id, fmt)
+            if not path or not os.path.exists(path):
+                raise HTTPException(status_code=404, detail="Trace not found")
+            
+            return FileResponse(
+                path,
+                media_type="application/json" if fmt == "chrome" else "application/octet-stream",
+                filename=os.path.basename(path)
+            )
+    
+    # ============================================================
+    # PROFILING METHODS
+    # ============================================================
+    
+    def require_admin(self, request: Request):
+        """Reject requests that don't carry the configured admin token"""
+        token = request.headers.get("x-admin-token", "")
+        if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="Admin token required")
+    
+    def profiling_requested(self, request: Request) -> bool:
+        """Check for the opt-in X-Profile header (admin only)"""
+        if request.headers.get("x-profile", "").strip().lower() not in ("1", "true", "yes", "on"):
+            return False
+        
+        self.require_admin(request)
+        return True
+    
+    async def run_profiled(self, label: str, handler, service: Optional[str] = None):
+        """Run a request handler under cProfile and the torch profiler.
+        
+        The handler builds the full response, so JSON/PNG encoding is
+        captured alongside mesh construction and model inference. For model
+        endpoints the service's inference lock is taken before profiling
+        starts, so time spent queueing stays out of the trace. Model work
+        still runs in a worker thread (see run_blocking), profiled there and
+        merged into the request's stats.
+        """
+        from torch.profiler import profile, record_function, ProfilerActivity
+        
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        
+        inference_lock = self.inference_locks[service] if service else contextlib.nullcontext()
+        async with self.profile_lock, inference_lock:
+            trace_id = uuid.uuid4().hex
+            session = {"loop": cProfile.Profile(), "threads": []}
+            started = time.time()
+            
+            active = profile_session.set(session)
+            with profile(activities=activities) as torch_prof:
+                with record_function(label):
+                    session["loop"].enable()
+                    try:
+                        response = await handler()
+                    finally:
+                        session["loop"].disable()
+                        profile_session.reset(active)
+            
+            # Traces can be large; write them without stalling the event loop
+            duration_ms = (time.time() - started) * 1000
+            profilers = [session["loop"]] + session["threads"]
+            await asyncio.to_thread(
+                self.save_profile_trace, trace_id, label, started, duration_ms, profilers, torch_prof
+            )
+        
+        response.headers["X-Profile-Id"] = trace_id
+        return response
+    
+    def save_profile_trace(self, trace_id: str, label: str, started: float,
+                           duration_ms: float, profilers, torch_prof):
+        """Write a trace into the on-disk ring buffer"""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        
+        # Merge the event-loop and worker-thread profiles (empty ones can't be loaded)
+        profilers = [profiler for profiler in profilers if profiler.getstats()]
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(os.path.join(PROFILE_DIR, f"{trace_id}.pstats"))
+        
+        formats = ["pstats"]
+        try:
+            torch_prof.export_chrome_trace(os.path.join(PROFILE_DIR, f"{trace_id}.chrome.json"))
+            formats.append("chrome")
+        except Exception as e:
+            logger.warning(f"⚠️ Chrome trace export failed: {e}")
+        
+        meta = {
+            "id": trace_id,
+            "endpoint": label,
+            "created": started,
+            "duration_ms": round(duration_ms, 2),
+            "formats": formats
+        }
+        with open(os.path.join(PROFILE_DIR, f"{trace_id}.meta.json"), "w") as f:
+            json.dump(meta, f)
+        
+        logger.info(f"⏱️ Profiled {label} in {duration_ms:.1f}ms (trace {trace_id})")
+        self.prune_profile_traces()
+    
+    def list_profile_traces(self):
+        """List stored traces, newest first"""
+        if not os.path.isdir(PROFILE_DIR):
+            return []
+        
+        traces = []
+        for name in os.listdir(PROFILE_DIR):
+            if not name.endswith(".meta.json"):
+                continue
+            try:
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    traces.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        
+        return sorted(traces, key=lambda t: t.get("created", 0), reverse=True)
+    
+    def prune_profile_traces(self):
+        """Drop the oldest traces once the ring buffer is full"""
+        for meta in self.list_profile_traces()[PROFILE_MAX_TRACES:]:
+            for fmt in ("pstats", "chrome", "meta"):
+                path = self.profile_trace_path(meta.get("id", ""), fmt)
+                if path and os.path.exists(path):
+                    os.unlink(path)
+    
+    def profile_trace_path(self, trace_id: str, fmt: str) -> Optional[str]:
+        """Resolve a trace file, rejecting anything that isn't a trace id"""
+        try:
+            trace_id = uuid.UUID(hex=trace_id).hex
+        except ValueError:
+            return None
+        
+        suffix = {"pstats": ".pstats", "chrome": ".chrome.json", "meta": ".meta.json"}[fmt]
+        return os.path.join(PROFILE_DIR, trace_id + suffix)
     
     # ============================================================
     # MODEL LOADING METHODS
@@ -291,25 +667,37 @@ class Project007LocalAI:
             logger.error(f"❌ Failed to load Shap-E: {e}")
             raise
     
-    async def load_whisper(self):
+    async def load_whisper(self, model_size: str = "base"):
         """Load Whisper for speech recognition"""
         try:
             import whisper
-            logger.info("🎤 Loading Whisper model...")
+            logger.info(f"🎤 Loading Whisper model ({model_size})...")
             
-            # Load Whisper model (base model for speed)
-            self.models['whisper'] = whisper.load_model("base")
+            # Base model for speed; smaller models serve degraded quality tiers
+            self.models[f'whisper_{model_size}'] = await asyncio.to_thread(whisper.load_model, model_size)
             
             logger.info("✅ Whisper loaded successfully")
             
         except ImportError:
             logger.warning("⚠️ Whisper not available, install with: pip install openai-whisper")
             # Fallback to basic implementation
-            self.models['whisper'] = {'type': 'fallback'}
+            self.models[f'whisper_{model_size}'] = {'type': 'fallback'}
         except Exception as e:
             logger.error(f"❌ Failed to load Whisper: {e}")
             raise
     
+    async def load_whisper_tiers(self):
+        """Load the Whisper model for every quality tier that isn't loaded yet"""
+        missing = [size for size in dict.fromkeys(WHISPER_TIER_MODELS.values())
+                   if f'whisper_{size}' not in self.models]
+        if not missing:
+            return
+        
+        async with self.inference_locks["whisper"]:
+            for model_size in missing:
+                if f'whisper_{model_size}' not in self.models:
+                    await self.load_whisper(model_size)
+    
     async def load_coqui_tts(self):
         """Load Coqui TTS for text-to-speech"""
         try:
@@ -354,6 +742,41 @@ class Project007LocalAI:
     # GENERATION METHODS
     # ============================================================
     
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run blocking model work in a worker thread.
+        
+        Under run_profiled the work gets its own cProfile in that thread, and
+        the event-loop profiler pauses meanwhile so other requests served
+        during the wait stay out of the trace.
+        """
+        session = profile_session.get()
+        if session is None:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        
+        def profiled():
+            from torch.profiler import record_function
+            
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                with record_function(getattr(fn, "__name__", "model_call")):
+                    return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                session["threads"].append(profiler)
+        
+        session["loop"].disable()
+        try:
+            return await asyncio.to_thread(profiled)
+        finally:
+            session["loop"].enable()
+    
+    def inference_slot(self, service: str):
+        """Serialize model calls per service (run_profiled already holds the lock)"""
+        if profile_session.get() is not None:
+            return contextlib.nullcontext()
+        return self.inference_locks[service]
+    
     async def generate_with_ollama(self, prompt: str, model: str) -> str:
         """Generate text using local Ollama"""
         try:
@@ -416,23 +839,129 @@ class Project007LocalAI:
         logger.info(f"🔷 Generating shape: {prompt}")
         
         # Create more complex procedural shape based on prompt
-        if 'sphere' in prompt.lower():
+        kind = self.classify_mesh_prompt(prompt)
+        if kind == 'sphere':
             return self.generate_sphere_mesh()
-        elif 'cube' in prompt.lower():
+        elif kind == 'cube':
             return self.generate_cube_mesh()
-        elif 'cylinder' in prompt.lower():
+        elif kind == 'cylinder':
             return self.generate_cylinder_mesh()
         else:
             return self.generate_complex_mesh(prompt)
     
-    async def transcribe_with_whisper(self, audio_path: str) -> str:
+    async def generate_instanced_scene(self, objects: list, seed: int, area: float,
+                                       transform_format: str) -> Dict[str, Any]:
+        """Compose many procedural objects into one instanced scene.
+        
+        Each object spec ({"prompt", "count", "variants", "scale_range"})
+        contributes a few seeded mesh variants to a shared library; its
+        instances only carry transforms, so payload and build time scale with
+        unique geometry. Every spec draws from its own seeded generator, so
+        editing one object leaves the rest of the scene unchanged.
+        """
+        logger.info(f"🏙️ Composing scene: {len(objects)} object types (seed {seed})")
+        
+        specs = [self.validate_scene_object(spec) for spec in objects]
+        total = sum(spec["count"] for spec in specs)
+        if total > SCENE_MAX_INSTANCES:
+            raise ValueError(f"Scene is limited to {SCENE_MAX_INSTANCES} instances")
+        
+        rngs = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(len(specs))]
+        meshes = []
+        instances = []
+        primitive_ids = {}
+        
+        def add_mesh(spec, kind, variant, mesh_data):
+            if len(meshes) >= SCENE_MAX_MESHES:
+                raise ValueError(f"Scene is limited to {SCENE_MAX_MESHES} unique meshes")
+            meshes.append({
+                "id": len(meshes),
+                "prompt": spec["prompt"],
+                "kind": kind,
+                "variant": variant,
+                "mesh_data": mesh_data
+            })
+            return len(meshes) - 1
+        
+        for spec, rng in zip(specs, rngs):
+            count = spec["count"]
+            if count == 0:
+                continue
+            
+            kind = self.classify_mesh_prompt(spec["prompt"])
+            
+            # Primitives have no seeded variation, so one library entry covers them
+            variants = min(spec["variants"], count) if kind in VARIED_MESH_KINDS else 1
+            variant_meshes = [self.generate_variant_mesh(kind, rng) for _ in range(variants)]
+            
+            # Per-instance placement, computed in bulk
+            assignment = rng.integers(0, variants, size=count)
+            transforms = self.generate_instance_transforms(
+                rng, count, area, spec["scale_range"], transform_format
+            )
+            
+            for variant, mesh_data in enumerate(variant_meshes):
+                selected = transforms[assignment == variant]
+                if not len(selected):
+                    continue  # Only ship geometry that some instance uses
+                
+                if kind in VARIED_MESH_KINDS:
+                    mesh_id = add_mesh(spec, kind, variant, mesh_data)
+                elif kind in primitive_ids:
+                    mesh_id = primitive_ids[kind]
+                else:
+                    mesh_id = primitive_ids[kind] = add_mesh(spec, kind, variant, mesh_data)
+                
+                instances.append({
+                    "mesh": mesh_id,
+                    "count": len(selected),
+                    "transforms": self.encode_array(selected)
+                })
+        
+        return {
+            "meshes": meshes,
+            "instances": instances,
+            "unique_meshes": len(meshes),
+            "instance_count": total
+        }
+    
+    def validate_scene_object(self, spec) -> Dict[str, Any]:
+        """Check one scene object spec and fill in defaults"""
+        if not isinstance(spec, dict):
+            raise ValueError("Each scene object must be an object")
+        
+        prompt = spec.get("prompt", "")
+        count = spec.get("count", 1)
+        variants = spec.get("variants", 1)
+        scale_range = spec.get("scale_range", [0.8, 1.2])
+        
+        if not prompt or not isinstance(prompt, str):
+            raise ValueError("Each scene object requires a prompt")
+        if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+            raise ValueError("count must be a non-negative integer")
+        if not isinstance(variants, int) or isinstance(variants, bool) or not 1 <= variants <= SCENE_MAX_VARIANTS:
+            raise ValueError(f"variants must be an integer between 1 and {SCENE_MAX_VARIANTS}")
+        if (not isinstance(scale_range, list) or len(scale_range) != 2
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in scale_range)
+                or not all(np.isfinite(v) for v in scale_range)
+                or not 0 < scale_range[0] <= scale_range[1]):
+            raise ValueError("scale_range must be finite [min, max] with 0 < min <= max")
+        
+        return {
+            "prompt": prompt,
+            "count": count,
+            "variants": variants,
+            "scale_range": [float(v) for v in scale_range]
+        }
+    
+    async def transcribe_with_whisper(self, audio_path: str, model_size: str = "base") -> str:
         """Transcribe audio with Whisper"""
         try:
-            if self.models['whisper']['type'] == 'fallback':
+            model = self.models[f'whisper_{model_size}']
+            if isinstance(model, dict) and model['type'] == 'fallback':
                 return f"[FALLBACK] Transcribed audio from {os.path.basename(audio_path)}"
             
-            model = self.models['whisper']
-            result = model.transcribe(audio_path)
+            result = await self.run_blocking(model.transcribe, audio_path)
             return result['text'].strip()
             
         except Exception as e:
@@ -463,30 +992,36 @@ class Project007LocalAI:
             return tmp.read()
     
     async def generate_with_stable_diffusion(self, prompt: str, negative_prompt: str, 
-                                           steps: int, guidance_scale: float) -> bytes:
+                                           steps: int, guidance_scale: float,
+                                           resolution: int = 512) -> bytes:
         """Generate image with Stable Diffusion"""
         try:
-            if self.models['stable_diffusion']['type'] == 'fallback':
+            pipe = self.models['stable_diffusion']
+            if isinstance(pipe, dict) and pipe['type'] == 'fallback':
                 # Create placeholder image
                 import PIL.Image
-                img = PIL.Image.new('RGB', (512, 512), color='blue')
+                img = PIL.Image.new('RGB', (resolution, resolution), color='blue')
                 
                 buffer = io.BytesIO()
                 img.save(buffer, format='PNG')
                 return buffer.getvalue()
             
-            pipe = self.models['stable_diffusion']
-            image = pipe(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                num_inference_steps=steps,
-                guidance_scale=guidance_scale
-            ).images[0]
-            
-            # Convert to bytes
-            buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            return buffer.getvalue()
+            def render():
+                image = pipe(
+                    prompt=prompt,
+                    negative_prompt=negative_prompt,
+                    num_inference_steps=steps,
+                    guidance_scale=guidance_scale,
+                    height=resolution,
+                    width=resolution
+                ).images[0]
+                
+                # Convert to bytes
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG')
+                return buffer.getvalue()
+            
+            return await self.run_blocking(render)
             
         except Exception as e:
             logger.error(f"Stable Diffusion generation failed: {e}")
@@ -577,17 +1112,91 @@ class Project007LocalAI:
             "uvs": [[i/len(vertices), 0] for i in range(len(vertices))]
         }
     
+    def classify_mesh_prompt(self, prompt: str) -> str:
+        """Map a prompt to a procedural mesh kind (cube by default)"""
+        for kind, words in MESH_KEYWORDS:
+            if any(word in prompt.lower() for word in words):
+                return kind
+        return 'cube'
+    
     def generate_complex_mesh(self, prompt: str):
         """Generate complex procedural mesh based on prompt"""
         # Analyze prompt for shape characteristics
-        if any(word in prompt.lower() for word in ['building', 'house', 'tower']):
+        kind = self.classify_mesh_prompt(prompt)
+        if kind == 'building':
             return self.generate_building_mesh()
-        elif any(word in prompt.lower() for word in ['tree', 'plant', 'organic']):
+        elif kind == 'organic':
             return self.generate_organic_mesh()
         else:
             return self.generate_cube_mesh()  # Default
     
-    def generate_building_mesh(self):
+    def generate_variant_mesh(self, kind: str, rng):
+        """Generate a seeded variation of the procedural mesh for a kind"""
+        if kind == 'building':
+            return self.generate_building_mesh(
+                floors=int(rng.integers(2, 7)),
+                base_size=float(rng.uniform(1.5, 3.0)),
+                taper=float(rng.uniform(0.6, 0.95)),
+                floor_height=float(rng.uniform(1.5, 2.5))
+            )
+        elif kind == 'organic':
+            return self.generate_organic_mesh(
+                trunk_segments=int(rng.integers(4, 10)),
+                segment_height=float(rng.uniform(0.4, 0.7)),
+                base_radius=float(rng.uniform(0.2, 0.4)),
+                wobble=float(rng.uniform(0.05, 0.2))
+            )
+        elif kind == 'sphere':
+            return self.generate_sphere_mesh()
+        elif kind == 'cylinder':
+            return self.generate_cylinder_mesh()
+        else:
+            return self.generate_cube_mesh()
+    
+    def generate_instance_transforms(self, rng, count: int, area: float,
+                                     scale_range, transform_format: str):
+        """Generate seeded per-instance transforms as a float32 array.
+        
+        "matrix" yields (count, 4, 4) row-major matrices with translation in
+        the last column; "trs" yields (count, 10) rows of translation (xyz),
+        rotation quaternion (xyzw) and scale (xyz). Z is up.
+        """
+        half = area / 2
+        translation = np.zeros((count, 3), dtype=np.float32)
+        translation[:, :2] = rng.uniform(-half, half, size=(count, 2))
+        yaw = rng.uniform(0, 2 * np.pi, size=count)
+        scale = rng.uniform(scale_range[0], scale_range[1], size=count)
+        
+        if transform_format == "trs":
+            trs = np.zeros((count, 10), dtype=np.float32)
+            trs[:, 0:3] = translation
+            trs[:, 5] = np.sin(yaw / 2)
+            trs[:, 6] = np.cos(yaw / 2)
+            trs[:, 7:10] = scale[:, None]
+            return trs
+        
+        cos, sin = np.cos(yaw) * scale, np.sin(yaw) * scale
+        matrices = np.zeros((count, 4, 4), dtype=np.float32)
+        matrices[:, 0, 0] = cos
+        matrices[:, 0, 1] = -sin
+        matrices[:, 1, 0] = sin
+        matrices[:, 1, 1] = cos
+        matrices[:, 2, 2] = scale
+        matrices[:, :3, 3] = translation
+        matrices[:, 3, 3] = 1
+        return matrices
+    
+    def encode_array(self, array: np.ndarray):
+        """Pack a NumPy array as base64 little-endian bytes for JSON transport"""
+        array = np.ascontiguousarray(array, dtype='<f4')
+        return {
+            "dtype": "float32",
+            "shape": list(array.shape),
+            "data": base64.b64encode(array.tobytes()).decode('ascii')
+        }
+    
+    def generate_building_mesh(self, floors: int = 3, base_size: float = 2,
+                               taper: float = 0.75, floor_height: float = 2):
         """Generate a building-like mesh"""
         # Create a multi-story building shape
         vertices = []
@@ -595,21 +1204,23 @@ class Project007LocalAI:
         
         # Base
         base_verts = [
-            [-2, -2, 0], [2, -2, 0], [2, 2, 0], [-2, 2, 0]
+            [-base_size, -base_size, 0], [base_size, -base_size, 0],
+            [base_size, base_size, 0], [-base_size, base_size, 0]
         ]
         vertices.extend(base_verts)
         
         # Multiple floors
-        for floor in range(1, 4):
-            height = floor * 2
+        size = base_size * taper
+        for floor in range(1, floors + 1):
+            height = floor * floor_height
             floor_verts = [
-                [-1.5, -1.5, height], [1.5, -1.5, height], 
-                [1.5, 1.5, height], [-1.5, 1.5, height]
+                [-size, -size, height], [size, -size, height], 
+                [size, size, height], [-size, size, height]
             ]
             vertices.extend(floor_verts)
         
         # Generate faces between floors
-        for floor in range(3):
+        for floor in range(floors):
             base_idx = floor * 4
             for i in range(4):
                 next_i = (i + 1) % 4
@@ -626,16 +1237,16 @@ class Project007LocalAI:
             "uvs": [[i/len(vertices), 0] for i in range(len(vertices))]
         }
     
-    def generate_organic_mesh(self):
+    def generate_organic_mesh(self, trunk_segments: int = 6, segment_height: float = 0.5,
+                              base_radius: float = 0.3, wobble: float = 0.1):
         """Generate an organic, tree-like mesh"""
         vertices = []
         faces = []
         
         # Tree trunk
-        trunk_segments = 6
         for i in range(trunk_segments):
-            height = i * 0.5
-            radius = 0.3 + 0.1 * np.sin(height)
+            height = i * segment_height
+            radius = base_radius + wobble * np.sin(height)
             
             for j in range(8):
                 angle = j * 2 * np.pi / 8